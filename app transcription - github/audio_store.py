@@ -0,0 +1,222 @@
+"""
+Magasin d'audio pré-décodé (16 kHz, mono, float32).
+
+Chaque fichier source (mp3, m4a…) n'est décodé qu'une seule fois : le
+résultat est écrit en `.npy` dans le magasin, indexé par l'empreinte du
+contenu. Les lectures suivantes se font en mémoire mappée (`mmap_mode="r"`)
+si bien que plusieurs workers partagent les mêmes pages sans copie.
+
+`load(path)` renvoie un tableau utilisable tel quel à la place du chemin
+dans `WhisperModel.transcribe(...)`. Les limites de taille et d'âge sont
+appliquées par le magasin lui-même après chaque ajout (au plus une fois par
+EVICT_INTERVAL secondes), quel que soit le point d'entrée.
+
+Usage : python audio_store.py add fichier1.mp3 fichier2.m4a
+        python audio_store.py evict | stats
+"""
+
+import os
+import sys
+import time
+import hashlib
+import pathlib
+import argparse
+import threading
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+STORE_DIR = pathlib.Path(
+    os.environ.get(
+        "WHISPER_AUDIO_STORE",
+        pathlib.Path.home() / ".cache" / "whisper-app" / "audio",
+    )
+)
+MAX_BYTES = int(float(os.environ.get("WHISPER_AUDIO_STORE_MAX_GB", "20")) * 1024 ** 3)
+MAX_AGE_DAYS = 30
+EVICT_INTERVAL = 60.0  # secondes minimum entre deux évictions automatiques
+TMP_MAX_AGE = 600.0    # un .tmp plus vieux vient d'une écriture interrompue (worker tué)
+_HASH_CHUNK = 1024 * 1024
+
+
+def content_hash(path: str) -> str:
+    """Empreinte BLAKE2b du contenu (indépendante du nom du fichier)."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class AudioStore:
+    def __init__(self, root=STORE_DIR, max_bytes: int = MAX_BYTES, max_age_days: float = MAX_AGE_DAYS):
+        self.root = pathlib.Path(root)
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        # (chemin, taille, mtime) -> empreinte, pour ne pas relire le fichier
+        self._hashes = {}
+        self._lock = threading.Lock()
+        self._last_evict = 0.0
+
+    # ---------------------------------------------------------
+    # Accès
+    # ---------------------------------------------------------
+    def key_for(self, path: str) -> str:
+        st = os.stat(path)
+        sig = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            key = self._hashes.get(sig)
+        if key is None:
+            key = content_hash(path)
+            with self._lock:
+                self._hashes[sig] = key
+        return key
+
+    def entry_path(self, key: str) -> pathlib.Path:
+        return self.root / key[:2] / f"{key}.npy"
+
+    def contains(self, path: str) -> bool:
+        return self.entry_path(self.key_for(path)).exists()
+
+    def add(self, path: str) -> pathlib.Path:
+        """Décode `path` dans le magasin s'il n'y est pas déjà."""
+        entry = self.entry_path(self.key_for(path))
+        if entry.exists():
+            return entry
+
+        from faster_whisper import decode_audio
+
+        audio = decode_audio(path, sampling_rate=SAMPLE_RATE).astype(np.float32, copy=False)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        # Écriture atomique : un worker concurrent ne lit jamais un fichier partiel
+        tmp = entry.with_name(f"{entry.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, audio, allow_pickle=False)
+        os.replace(tmp, entry)
+        self._maybe_evict(keep=entry)
+        return entry
+
+    def load(self, path: str) -> np.ndarray:
+        """Audio 16 kHz float32 en mémoire mappée (lecture seule)."""
+        entry = self.add(path)
+        try:
+            os.utime(entry)  # sert d'horodatage LRU pour l'éviction
+        except OSError:
+            pass
+        return np.load(entry, mmap_mode="r", allow_pickle=False)
+
+    # ---------------------------------------------------------
+    # Éviction
+    # ---------------------------------------------------------
+    def _entries(self, pattern: str = "*/*.npy"):
+        if not self.root.exists():
+            return []
+        entries = []
+        for p in self.root.glob(pattern):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        return entries
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        partial = self._entries("*/*.tmp")
+        return {"files": len(entries), "bytes": sum(e[1] for e in entries + partial),
+                "partial": len(partial), "root": str(self.root)}
+
+    def _maybe_evict(self, keep: pathlib.Path = None):
+        with self._lock:
+            now = time.time()
+            if now - self._last_evict < EVICT_INTERVAL:
+                return
+            self._last_evict = now
+        self.evict(keep)
+
+    def evict(self, keep: pathlib.Path = None) -> int:
+        """Supprime les entrées trop vieilles puis les moins récentes au-delà de `max_bytes`.
+
+        `keep` (l'entrée qui vient d'être ajoutée) n'est jamais supprimée. Les
+        `.tmp` orphelins sont supprimés ; ceux en cours d'écriture comptent dans
+        la taille totale.
+        """
+        now = time.time()
+        removed = 0
+        writing = 0
+        for mtime, size, p in self._entries("*/*.tmp"):
+            if now - mtime > TMP_MAX_AGE:
+                removed += self._remove(p)
+            else:
+                writing += size
+        kept = []
+        for mtime, size, p in self._entries():
+            if p == keep:
+                continue
+            if now - mtime > self.max_age:
+                removed += self._remove(p)
+            else:
+                kept.append((mtime, size, p))
+
+        total = sum(e[1] for e in kept) + writing
+        total += keep.stat().st_size if keep and keep.exists() else 0
+        for mtime, size, p in sorted(kept):
+            if total <= self.max_bytes:
+                break
+            removed += self._remove(p)
+            total -= size
+        return removed
+
+    @staticmethod
+    def _remove(p: pathlib.Path) -> int:
+        try:
+            p.unlink()
+            return 1
+        except OSError:
+            # Sous Windows un fichier encore mappé ne peut pas être supprimé
+            return 0
+
+
+_default_store = None
+
+
+def default_store() -> AudioStore:
+    global _default_store
+    if _default_store is None:
+        _default_store = AudioStore()
+    return _default_store
+
+
+def load(path: str):
+    """Remplaçant direct du chemin audio ; se rabat sur `path` si le magasin échoue."""
+    try:
+        return default_store().load(path)
+    except Exception as e:
+        print(f"[WARN] Magasin audio indisponible pour {os.path.basename(path)} : {e}")
+        return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Magasin d'audio pré-décodé 16 kHz.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_add = sub.add_parser("add", help="décode des fichiers dans le magasin")
+    p_add.add_argument("files", nargs="+")
+    sub.add_parser("evict", help="applique les limites de taille et d'âge")
+    sub.add_parser("stats", help="affiche l'occupation du magasin")
+    args = parser.parse_args(argv)
+
+    store = default_store()
+    if args.cmd == "add":
+        for f in args.files:
+            print(f"{os.path.basename(f)} -> {store.add(f)}")
+        store.evict()
+    elif args.cmd == "evict":
+        print(f"{store.evict()} entrée(s) supprimée(s)")
+    else:
+        s = store.stats()
+        print(f"{s['files']} fichier(s) (+{s['partial']} en écriture), "
+              f"{s['bytes'] / 1024 ** 2:.1f} Mo dans {s['root']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
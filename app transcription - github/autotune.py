@@ -0,0 +1,289 @@
+"""
+Autotuning matériel pour faster-whisper.
+
+Lance de courtes transcriptions de calibration sur la machine, cherche la
+meilleure combinaison « jobs concurrents × threads par job × compute_type »
+(en débit et en latence) puis enregistre un profil JSON chargé
+automatiquement :
+  - « latency » (un fichier à la fois) par `opti whisper.py`,
+    `transcription whisper.py` et `transcription.py` ;
+  - « throughput » par `distributed.py worker`, qui traite `jobs` fichiers
+    en parallèle avec `cpu_threads` threads chacun.
+
+Le nombre de nœuds NUMA est relevé dans le profil à titre indicatif
+seulement : aucune affinité CPU/mémoire n'est appliquée.
+
+Le profil est écrit dans `~/.cache/whisper-app/autotune.json` ; la
+variable `WHISPER_AUTOTUNE_PROFILE` change cet emplacement, à la fois pour
+l'écriture et pour la lecture par les points d'entrée.
+
+Usage : python autotune.py fichier_audio [--model small] [--seconds 30]
+"""
+
+import os
+import sys
+import json
+import glob
+import time
+import pathlib
+import argparse
+import platform
+from concurrent.futures import ThreadPoolExecutor
+
+PROFILE_VERSION = 1
+PROFILE_PATH = pathlib.Path(
+    os.environ.get(
+        "WHISPER_AUTOTUNE_PROFILE",
+        pathlib.Path.home() / ".cache" / "whisper-app" / "autotune.json",
+    )
+)
+
+# Modes disponibles : "throughput" pour les lots, "latency" pour un fichier seul
+MODES = ("throughput", "latency")
+
+
+# -------------------------------------------------------------
+# Détection matérielle
+# -------------------------------------------------------------
+def _read_cpuinfo() -> str:
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8", errors="ignore") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def _physical_cores(cpuinfo: str) -> int:
+    """Nombre de cœurs physiques (sans l'hyperthreading)."""
+    cores = set()
+    phys_id = core_id = None
+    for line in cpuinfo.splitlines():
+        if ":" not in line:
+            if phys_id is not None and core_id is not None:
+                cores.add((phys_id, core_id))
+            phys_id = core_id = None
+            continue
+        key, _, value = line.partition(":")
+        key = key.strip()
+        if key == "physical id":
+            phys_id = value.strip()
+        elif key == "core id":
+            core_id = value.strip()
+    if phys_id is not None and core_id is not None:
+        cores.add((phys_id, core_id))
+    if cores:
+        return len(cores)
+
+    try:
+        import psutil  # facultatif ; utile sous Windows / macOS
+        n = psutil.cpu_count(logical=False)
+        if n:
+            return n
+    except ImportError:
+        pass
+    return os.cpu_count() or 1
+
+
+def _cpu_flags(cpuinfo: str) -> set:
+    for line in cpuinfo.splitlines():
+        if line.startswith("flags") or line.startswith("Features"):
+            return set(line.partition(":")[2].split())
+    return set()
+
+
+def _numa_nodes() -> int:
+    nodes = glob.glob("/sys/devices/system/node/node[0-9]*")
+    return max(1, len(nodes))
+
+
+def _supported_compute_types(device: str) -> list:
+    """Types de calcul que CTranslate2 sait exécuter sur ce device."""
+    try:
+        import ctranslate2
+        return sorted(ctranslate2.get_supported_compute_types(device))
+    except Exception:
+        return []
+
+
+def detect_hardware() -> dict:
+    """Décrit la machine : cœurs physiques/logiques, NUMA, AVX, GPU."""
+    cpuinfo = _read_cpuinfo()
+    flags = _cpu_flags(cpuinfo)
+    try:
+        import torch  # facultatif ; seulement pour détecter un éventuel GPU
+        cuda = bool(torch.cuda.is_available())
+    except ImportError:
+        cuda = False
+
+    return {
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "logical_cores": os.cpu_count() or 1,
+        "physical_cores": _physical_cores(cpuinfo),
+        "numa_nodes": _numa_nodes(),
+        "avx": "avx" in flags,
+        "avx2": "avx2" in flags,
+        "avx512": "avx512f" in flags,
+        "cuda": cuda,
+        "compute_types": _supported_compute_types("cpu"),
+    }
+
+
+# -------------------------------------------------------------
+# Espace de recherche
+# -------------------------------------------------------------
+def candidate_compute_types(hw: dict) -> list:
+    supported = hw.get("compute_types") or []
+    if supported:
+        return [ct for ct in ("int8", "int8_float32", "float32") if ct in supported] or supported
+    # Sans ctranslate2 on se fie aux flags : l'int8 n'est rentable qu'avec AVX2
+    return ["int8", "float32"] if hw.get("avx2") else ["float32"]
+
+
+def candidate_layouts(hw: dict) -> list:
+    """Couples (jobs, threads_par_job) couvrant les cœurs physiques."""
+    cores = max(1, hw["physical_cores"])
+    layouts = []
+    jobs = 1
+    while jobs <= cores:
+        layouts.append((jobs, cores // jobs))
+        jobs *= 2
+    return layouts
+
+
+# -------------------------------------------------------------
+# Calibration
+# -------------------------------------------------------------
+def _run_calibration(model, audio, jobs: int, language: str) -> list:
+    """Transcrit `jobs` copies du clip en parallèle ; renvoie les durées par job."""
+    def one():
+        t0 = time.perf_counter()
+        segments, _ = model.transcribe(audio, language=language, beam_size=5, vad_filter=True)
+        for _ in segments:
+            pass
+        return time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(lambda _: one(), range(jobs)))
+
+
+def calibrate(audio_path: str, model_name: str = "small", seconds: float = 30.0,
+              language: str = "fr", log=print) -> dict:
+    """Mesure chaque configuration candidate et construit le profil."""
+    import audio_store
+    import model_bundle
+
+    hw = detect_hardware()
+    audio = audio_store.default_store().load(audio_path)[: int(seconds * 16000)]
+    clip_seconds = len(audio) / 16000 or 1.0
+    log(f"[INFO] Matériel : {hw['physical_cores']} cœurs physiques, "
+        f"{hw['numa_nodes']} nœud(s) NUMA (indicatif), AVX2={hw['avx2']}, AVX-512={hw['avx512']}")
+
+    results = []
+    for compute_type in candidate_compute_types(hw):
+        for jobs, threads in candidate_layouts(hw):
+            try:
+                model = model_bundle.load_model(model_name, device="cpu", compute_type=compute_type,
+                                                cpu_threads=threads, num_workers=jobs)
+                _run_calibration(model, audio[: 16000 * 2], 1, language)  # échauffement
+                durations = _run_calibration(model, audio, jobs, language)
+            except Exception as e:
+                log(f"[WARN] {compute_type} {jobs}x{threads} ignoré : {e}")
+                continue
+            wall = max(durations)
+            result = {
+                "compute_type": compute_type,
+                "jobs": jobs,
+                "cpu_threads": threads,
+                "latency_s": round(sum(durations) / len(durations), 3),
+                "throughput_x": round(jobs * clip_seconds / wall, 3),
+            }
+            log(f"  {compute_type:<13} {jobs:>2} job(s) × {threads:>2} threads : "
+                f"latence {result['latency_s']:.2f}s, débit ×{result['throughput_x']:.2f}")
+            results.append(result)
+            del model
+
+    if not results:
+        raise RuntimeError("Aucune configuration n'a pu être calibrée.")
+
+    best_tp = max(results, key=lambda r: r["throughput_x"])
+    best_lat = min(results, key=lambda r: r["latency_s"])
+    return {
+        "version": PROFILE_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "model": model_name,
+        "clip_seconds": round(clip_seconds, 2),
+        "hardware": hw,
+        "throughput": {k: best_tp[k] for k in ("compute_type", "jobs", "cpu_threads")},
+        "latency": {k: best_lat[k] for k in ("compute_type", "jobs", "cpu_threads")},
+        "results": results,
+    }
+
+
+# -------------------------------------------------------------
+# Profil
+# -------------------------------------------------------------
+def save_profile(profile: dict, path: pathlib.Path = PROFILE_PATH) -> pathlib.Path:
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(profile, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def load_profile(mode: str = "throughput", path: pathlib.Path = PROFILE_PATH):
+    """Réglages du profil pour `mode`, ou None si aucun profil valide."""
+    if mode not in MODES:
+        raise ValueError(f"Mode inconnu : {mode}")
+    try:
+        profile = json.loads(pathlib.Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if profile.get("version") != PROFILE_VERSION:
+        return None
+    # Un profil calibré sur une autre machine ne s'applique pas
+    if profile.get("hardware", {}).get("logical_cores") != (os.cpu_count() or 1):
+        return None
+    return profile.get(mode)
+
+
+def model_kwargs(device: str = "cpu", mode: str = "latency") -> dict:
+    """Arguments `WhisperModel(...)` issus du profil, avec repli sur les défauts du projet."""
+    if device == "cuda":
+        return {"device": "cuda", "compute_type": "float16"}
+    settings = load_profile(mode)
+    if not settings:
+        return {"device": "cpu", "compute_type": "int8"}
+    return {
+        "device": "cpu",
+        "compute_type": settings["compute_type"],
+        "cpu_threads": settings["cpu_threads"],
+        "num_workers": settings["jobs"],
+    }
+
+
+def parallel_jobs(default: int) -> int:
+    """Nombre de transcriptions simultanées conseillé pour un lot (`distributed.py worker`)."""
+    settings = load_profile("throughput")
+    return settings["jobs"] if settings else default
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibre faster-whisper pour cette machine.")
+    parser.add_argument("audio", help="fichier audio représentatif (parole)")
+    parser.add_argument("--model", default="small", help="modèle utilisé pour la calibration")
+    parser.add_argument("--seconds", type=float, default=30.0, help="durée du clip de calibration")
+    parser.add_argument("--language", default="fr")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "TRUE")
+    profile = calibrate(args.audio, args.model, args.seconds, args.language)
+    path = save_profile(profile)
+    print(f"\nDébit   : {profile['throughput']}")
+    print(f"Latence : {profile['latency']}")
+    print(f"Profil enregistré : {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
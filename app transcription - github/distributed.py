@@ -0,0 +1,453 @@
+"""
+Traitement par lot réparti sur plusieurs machines via un dossier partagé (NFS).
+
+Arborescence du dossier partagé :
+    inbox/       fichiers audio à transcrire
+    leases/      un bail `<fichier>.lease` par fichier en cours (JSON + mtime = heartbeat)
+                 et un compteur `<fichier>.attempts` qui survit aux libérations de bail
+    results/     `<fichier>.txt` (transcription) et `<fichier>.json` (métriques)
+    processed/   fichiers audio terminés
+    failed/      fichiers en échec après MAX_ATTEMPTS tentatives
+    metrics/     `<nœud>.jsonl`, une ligne par fichier traité
+
+Un worker réclame un fichier en créant son bail avec O_CREAT|O_EXCL
+(atomique, y compris sur NFSv3+), rafraîchit le mtime du bail toutes les
+HEARTBEAT secondes et le supprime une fois le résultat écrit. Un bail dont
+le mtime dépasse LEASE_TTL appartient à un nœud planté : il est renommé
+(un seul nœud gagne) puis le fichier est repris. Chaque prise de bail
+incrémente le compteur de tentatives ; au-delà de MAX_ATTEMPTS (erreurs ou
+plantages), le fichier part dans `failed/`.
+
+Chaque nœud traite `jobs` fichiers à la fois (profil « throughput » de
+`autotune.py`, sinon 1), avec `cpu_threads` dimensionné pour ce parallélisme.
+
+L'index de recherche SQLite n'est pas alimenté ici (SQLite et NFS ne font
+pas bon ménage) ; les métriques JSON contiennent les segments horodatés.
+
+Usage : python distributed.py submit  PARTAGE fichier1.mp3 …
+        python distributed.py worker  PARTAGE [--model large-v3] [--exit-when-empty]
+        python distributed.py status  PARTAGE
+        python distributed.py selftest      (plusieurs processus locaux, faux transcripteur)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+LEASE_TTL = 60.0      # secondes sans heartbeat avant de considérer un nœud mort
+HEARTBEAT = 10.0      # période de rafraîchissement du bail
+POLL_INTERVAL = 5.0   # attente quand l'inbox est vide
+MAX_ATTEMPTS = 3
+
+SUBDIRS = ("inbox", "leases", "results", "processed", "failed", "metrics")
+AUDIO_EXTS = (".mp3", ".wav", ".m4a", ".flac")
+
+
+def node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def init_share(root: str):
+    for d in SUBDIRS:
+        os.makedirs(os.path.join(root, d), exist_ok=True)
+
+
+def _write_atomic(path: str, data: str):
+    tmp = f"{path}.{node_id()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# -------------------------------------------------------------
+# Baux
+# -------------------------------------------------------------
+class Lease:
+    """Bail exclusif sur un fichier de l'inbox, maintenu par un thread de heartbeat."""
+
+    def __init__(self, root: str, name: str, node: str, attempt: int):
+        self.path = os.path.join(root, "leases", name + ".lease")
+        self.attempts_path = os.path.join(root, "leases", name + ".attempts")
+        self.node = node
+        self.attempt = attempt
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def acquire(cls, root: str, name: str, node: str):
+        """Crée le bail ou reprend un bail expiré ; None si le fichier est déjà pris ou a quitté l'inbox."""
+        path = os.path.join(root, "leases", name + ".lease")
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            st = None
+
+        if st is not None:
+            if time.time() - st.st_mtime < LEASE_TTL:
+                return None  # bail vivant
+            stale = _read_lease(path)
+            # Un seul nœud réussit le renommage du bail expiré
+            grave = f"{path}.stale.{node}"
+            try:
+                os.rename(path, grave)
+            except OSError:
+                return None
+            # Entre le stat et le rename, le propriétaire a pu rafraîchir son bail
+            if _read_lease(grave).get("node") != stale.get("node") or \
+                    time.time() - os.stat(grave).st_mtime < LEASE_TTL:
+                try:
+                    os.rename(grave, path)
+                except OSError:
+                    pass
+                return None
+            os.remove(grave)
+
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return None
+        if not os.path.exists(os.path.join(root, "inbox", name)):
+            # Terminé par un autre nœud depuis le listing : ne pas compter de tentative
+            os.close(fd)
+            os.remove(path)
+            return None
+        # Le bail est à nous : on peut incrémenter le compteur sans course
+        attempts_path = os.path.join(root, "leases", name + ".attempts")
+        attempt = _read_attempts(attempts_path) + 1
+        _write_atomic(attempts_path, str(attempt))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"node": node, "attempt": attempt, "claimed": time.time()}, f)
+        lease = cls(root, name, node, attempt)
+        lease._start()
+        return lease
+
+    def forget_attempts(self):
+        """À appeler quand le fichier quitte l'inbox (terminé ou en échec)."""
+        try:
+            os.remove(self.attempts_path)
+        except OSError:
+            pass
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._beat, daemon=True)
+        self._thread.start()
+
+    def _beat(self):
+        while not self._stop.wait(HEARTBEAT):
+            if _read_lease(self.path).get("node") != self.node:
+                self.lost.set()  # bail repris par un autre nœud
+                return
+            try:
+                os.utime(self.path)
+            except OSError:
+                self.lost.set()
+                return
+
+    def release(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if _read_lease(self.path).get("node") == self.node:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def _read_attempts(path: str) -> int:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _read_lease(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# -------------------------------------------------------------
+# Transcription
+# -------------------------------------------------------------
+def whisper_processor(model_name: str, language: str):
+    """Fonction `chemin -> (segments, durée audio)` basée sur faster-whisper."""
+    import autotune
+    import audio_store
+    import model_bundle
+
+    import language_detect
+
+    # cpu_threads = cœurs // jobs : dimensionné pour `Worker.run(jobs=...)`
+    kwargs = autotune.model_kwargs("cpu", mode="throughput")
+    models = {}
+    models_lock = threading.Lock()
+
+    def get_model(name):
+        with models_lock:
+            if name not in models:
+                models[name] = model_bundle.load_model(name, **kwargs)
+            return models[name]
+
+    get_model(model_name)
+
+    def process(path):
+        lang, name = language, model_name
+        if lang == language_detect.AUTO:
+            lang = language_detect.detect(path, model=get_model(model_name))["language"]
+            name = language_detect.model_for(lang, model_name, kwargs["compute_type"])
+        segments, info = get_model(name).transcribe(
+            audio_store.load(path), language=lang, beam_size=5, vad_filter=True
+        )
+        return [(s.start, s.end, s.text) for s in segments], info.duration
+
+    return process
+
+
+class Worker:
+    def __init__(self, root: str, process, node: str = None):
+        self.root = root
+        self.process = process
+        self.node = node or node_id()
+        init_share(root)
+
+    def _dir(self, sub: str) -> str:
+        return os.path.join(self.root, sub)
+
+    def pending(self) -> list:
+        return sorted(
+            f for f in os.listdir(self._dir("inbox"))
+            if f.lower().endswith(AUDIO_EXTS)
+        )
+
+    def claim(self):
+        names = self.pending()
+        random.shuffle(names)  # limite la contention entre nœuds
+        for name in names:
+            lease = Lease.acquire(self.root, name, self.node)
+            if lease is None:
+                continue  # pris par un autre nœud, ou déjà terminé
+            return name, lease
+        return None, None
+
+    def run_one(self, name: str, lease: Lease) -> bool:
+        src = os.path.join(self._dir("inbox"), name)
+        stem = os.path.splitext(name)[0]
+        if lease.attempt > MAX_ATTEMPTS:
+            # Dernière tentative interrompue par un plantage
+            shutil.move(src, os.path.join(self._dir("failed"), name))
+            lease.forget_attempts()
+            lease.release()
+            return False
+
+        t0 = time.time()
+        metrics = {"file": name, "node": self.node, "attempt": lease.attempt, "started": t0}
+        try:
+            segments, duration = self.process(src)
+            if lease.lost.is_set():
+                return False  # un autre nœud a repris le fichier ; on jette le résultat
+            elapsed = time.time() - t0
+            metrics.update(
+                status="ok",
+                elapsed_s=round(elapsed, 3),
+                audio_s=round(duration or 0.0, 3),
+                rtf=round(elapsed / duration, 4) if duration else None,
+                segments=[{"start": s, "end": e, "text": t} for s, e, t in segments],
+            )
+            _write_atomic(os.path.join(self._dir("results"), stem + ".txt"),
+                          "".join(t + "\n" for _, _, t in segments))
+            _write_atomic(os.path.join(self._dir("results"), stem + ".json"),
+                          json.dumps(metrics, ensure_ascii=False, indent=2))
+            shutil.move(src, os.path.join(self._dir("processed"), name))
+            lease.forget_attempts()
+            ok = True
+        except Exception as e:
+            metrics.update(status="error", error=str(e), elapsed_s=round(time.time() - t0, 3))
+            ok = False
+            if lease.attempt >= MAX_ATTEMPTS:
+                shutil.move(src, os.path.join(self._dir("failed"), name))
+                lease.forget_attempts()
+        finally:
+            if not lease.lost.is_set():
+                lease.release()
+
+        metrics.pop("segments", None)
+        with open(os.path.join(self._dir("metrics"), self.node + ".jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(metrics, ensure_ascii=False) + "\n")
+        return ok
+
+    def run(self, exit_when_empty: bool = False, log=print, jobs: int = 1) -> int:
+        """Traite l'inbox avec `jobs` fichiers en parallèle ; renvoie le nombre de succès."""
+        if jobs <= 1:
+            return self._loop(exit_when_empty, log)
+        counts = [0] * jobs
+
+        def loop(i):
+            counts[i] = self._loop(exit_when_empty, log)
+
+        threads = [threading.Thread(target=loop, args=(i,), daemon=True) for i in range(jobs)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return sum(counts)
+
+    def _loop(self, exit_when_empty: bool, log) -> int:
+        done = 0
+        while True:
+            name, lease = self.claim()
+            if name is None:
+                # Tant que l'inbox n'est pas vide, un nœud planté peut libérer du travail
+                if exit_when_empty and not self.pending():
+                    return done
+                time.sleep(POLL_INTERVAL)
+                continue
+            log(f"[{self.node}] {name} (tentative {lease.attempt})")
+            if self.run_one(name, lease):
+                done += 1
+
+
+def status(root: str) -> dict:
+    init_share(root)
+    count = lambda sub, ext: sum(1 for f in os.listdir(os.path.join(root, sub)) if f.endswith(ext))
+    audio_s = elapsed_s = 0.0
+    for fname in os.listdir(os.path.join(root, "metrics")):
+        with open(os.path.join(root, "metrics", fname), encoding="utf-8") as f:
+            for line in f:
+                m = json.loads(line)
+                if m.get("status") == "ok":
+                    audio_s += m.get("audio_s") or 0.0
+                    elapsed_s += m.get("elapsed_s") or 0.0
+    return {
+        "inbox": count("inbox", AUDIO_EXTS),
+        "leases": count("leases", ".lease"),
+        "processed": count("processed", AUDIO_EXTS),
+        "failed": count("failed", AUDIO_EXTS),
+        "audio_hours": round(audio_s / 3600, 2),
+        "cpu_hours": round(elapsed_s / 3600, 2),
+    }
+
+
+# -------------------------------------------------------------
+# Auto-test : plusieurs processus locaux sur un dossier temporaire
+# -------------------------------------------------------------
+def _fake_process(path):
+    """Faux transcripteur : 0,2 s par fichier, échec systématique si « fail » dans le nom."""
+    if "fail" in os.path.basename(path):
+        raise RuntimeError("échec simulé")
+    time.sleep(0.2)
+    return [(0.0, 1.0, "bonjour " + os.path.basename(path))], 10.0
+
+
+def _hang_process(path):
+    time.sleep(3600)  # nœud qui sera tué en tenant son bail
+
+
+def _selftest_node(root, node, hang, timings):
+    global LEASE_TTL, HEARTBEAT, POLL_INTERVAL
+    LEASE_TTL, HEARTBEAT, POLL_INTERVAL = timings
+    worker = Worker(root, _hang_process if hang else _fake_process, node=node)
+    worker.run(exit_when_empty=True, log=lambda *_: None)
+
+
+def _selftest_round(root, n_files, n_nodes, timings, kill_one=False) -> float:
+    init_share(root)
+    for k in range(n_files):
+        open(os.path.join(root, "inbox", f"f{k:03d}.wav"), "wb").close()
+    open(os.path.join(root, "inbox", "fail.wav"), "wb").close()
+
+    if kill_one:
+        victim = multiprocessing.Process(target=_selftest_node, args=(root, "victim", True, timings))
+        victim.start()
+        while not any(f.endswith(".lease") for f in os.listdir(os.path.join(root, "leases"))):
+            time.sleep(0.05)
+        victim.kill()
+        victim.join()
+
+    t0 = time.time()
+    nodes = [multiprocessing.Process(target=_selftest_node, args=(root, f"n{i}", False, timings))
+             for i in range(n_nodes)]
+    for p in nodes:
+        p.start()
+    for p in nodes:
+        p.join()
+    return time.time() - t0
+
+
+def selftest(n_files: int = 24, n_nodes: int = 4) -> bool:
+    """Vérifie le protocole (nœud tué, échecs répétés) et le passage à l'échelle."""
+    timings = (1.0, 0.2, 0.1)  # LEASE_TTL, HEARTBEAT, POLL_INTERVAL raccourcis
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        one = _selftest_round(os.path.join(tmp, "un"), n_files, 1, timings)
+        root = os.path.join(tmp, "multi")
+        many = _selftest_round(root, n_files, n_nodes, timings, kill_one=True)
+        s = status(root)
+        attempts = [f for f in os.listdir(os.path.join(root, "leases")) if f.endswith(".attempts")]
+        checks = {
+            "inbox vide": s["inbox"] == 0,
+            "aucun bail restant": s["leases"] == 0 and not attempts,
+            f"{n_files} fichiers traités (dont celui du nœud tué)": s["processed"] == n_files,
+            "fichier en échec dans failed/": s["failed"] == 1,
+            f"accélération ×{one / many:.1f} avec {n_nodes} nœuds": one / many > n_nodes / 2,
+        }
+        for label, passed in checks.items():
+            print(f"[{'OK' if passed else 'ÉCHEC'}] {label}")
+            ok &= passed
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcription répartie sur un dossier partagé.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_submit = sub.add_parser("submit", help="copie des fichiers dans l'inbox")
+    p_submit.add_argument("root")
+    p_submit.add_argument("files", nargs="+")
+    p_worker = sub.add_parser("worker", help="traite l'inbox jusqu'à interruption")
+    p_worker.add_argument("root")
+    p_worker.add_argument("--model", default="large-v3")
+    p_worker.add_argument("--language", default="fr", help='code langue, ou "auto"')
+    p_worker.add_argument("--exit-when-empty", action="store_true")
+    p_worker.add_argument("--jobs", type=int, help="fichiers traités en parallèle (défaut : profil autotune)")
+    p_status = sub.add_parser("status", help="état de la file et débit cumulé")
+    p_status.add_argument("root")
+    sub.add_parser("selftest", help="teste le protocole avec plusieurs processus locaux")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "submit":
+        init_share(args.root)
+        for f in args.files:
+            dst = os.path.join(args.root, "inbox", os.path.basename(f))
+            # Copie sous un nom temporaire pour qu'aucun worker ne lise un fichier partiel
+            shutil.copy2(f, dst + ".part")
+            os.replace(dst + ".part", dst)
+        print(f"{len(args.files)} fichier(s) soumis")
+    elif args.cmd == "worker":
+        os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "TRUE")
+        import autotune
+        jobs = args.jobs or autotune.parallel_jobs(1)
+        worker = Worker(args.root, whisper_processor(args.model, args.language))
+        print(f"{worker.run(args.exit_when_empty, jobs=jobs)} fichier(s) transcrit(s)")
+    elif args.cmd == "selftest":
+        return 0 if selftest() else 1
+    else:
+        for k, v in status(args.root).items():
+            print(f"{k:>12} : {v}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
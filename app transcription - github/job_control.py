@@ -0,0 +1,159 @@
+"""
+Contrôle coopératif des transcriptions en cours : annulation, pause/reprise
+et préemption par priorité.
+
+faster-whisper produit les segments à la demande (générateur) : tant que le
+thread de transcription est bloqué dans `JobControl.checkpoint()`, aucun
+calcul n'est lancé et les cœurs sont libérés. Une pause prend donc effet à la
+fin du segment en cours (au plus une fenêtre de 30 s d'audio).
+"""
+
+import time
+import threading
+
+
+class JobCancelled(Exception):
+    """Levée dans le thread de transcription quand le job est annulé."""
+
+
+class JobControl:
+    def __init__(self, name: str, priority: int = 0, cpu_threads: int = 1):
+        self.name = name
+        self.priority = priority
+        self.cpu_threads = max(1, cpu_threads)
+        self.position = 0.0          # dernier horodatage traité (checkpoint), en secondes d'audio
+        self.duration = None         # durée totale de l'audio si connue
+        self.started = time.time()
+        self.segments_started = None     # premier checkpoint(position) : base du calcul de RTF
+        self._paused_before_segments = 0.0
+        self.paused_seconds = 0.0        # toutes pauses confondues
+        self.user_paused_seconds = 0.0   # pauses demandées par l'utilisateur seulement
+        self._cancelled = threading.Event()
+        self._cond = threading.Condition()
+        self._pause_reasons = set()  # "user", "preempt"…
+        self._paused_at = None
+        self._user_paused_at = None
+        self._cancelled_at = None
+
+    # ---------------------------------------------------------
+    # Commandes (thread UI)
+    # ---------------------------------------------------------
+    def cancel(self):
+        self._cancelled_at = time.time()
+        self._cancelled.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def pause(self, reason: str = "user"):
+        with self._cond:
+            now = time.time()
+            if not self._pause_reasons:
+                self._paused_at = now
+            if reason == "user" and reason not in self._pause_reasons:
+                self._user_paused_at = now
+            self._pause_reasons.add(reason)
+
+    def resume(self, reason: str = "user"):
+        with self._cond:
+            now = time.time()
+            if reason == "user" and self._user_paused_at is not None:
+                self.user_paused_seconds += now - self._user_paused_at
+                self._user_paused_at = None
+            self._pause_reasons.discard(reason)
+            if not self._pause_reasons and self._paused_at is not None:
+                self.paused_seconds += now - self._paused_at
+                self._paused_at = None
+            self._cond.notify_all()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return bool(self._pause_reasons)
+
+    # ---------------------------------------------------------
+    # Côté thread de transcription
+    # ---------------------------------------------------------
+    def checkpoint(self, position: float = None):
+        """Appelée entre deux segments : enregistre l'avancement, bloque si en pause.
+
+        Le premier appel avec `position` (0.0 juste avant le premier segment)
+        marque le début du décodage : décodage audio et détection de langue,
+        qui le précèdent, ne faussent pas le RTF.
+        """
+        if position is not None:
+            self.position = position
+        with self._cond:
+            while self._pause_reasons and not self._cancelled.is_set():
+                self._cond.wait()
+            if position is not None and self.segments_started is None:
+                self.segments_started = time.time()
+                self._paused_before_segments = self.paused_seconds
+        if self._cancelled.is_set():
+            raise JobCancelled(self.name)
+
+    # ---------------------------------------------------------
+    # Mesure
+    # ---------------------------------------------------------
+    def freed_core_seconds(self) -> float:
+        """Temps cœur rendu à la machine : pauses utilisateur + reste estimé d'un job annulé.
+
+        Les pauses de préemption ne comptent pas : les cœurs servent alors au job urgent.
+        """
+        now = time.time()
+        freed = self.user_paused_seconds
+        if self._user_paused_at is not None:
+            freed += now - self._user_paused_at
+        if self._cancelled_at is not None and self.duration and self.position > 0 \
+                and self.segments_started is not None:
+            paused = self.paused_seconds - self._paused_before_segments
+            if self._paused_at is not None:  # annulé pendant une pause
+                paused += max(0.0, self._cancelled_at - self._paused_at)
+            busy = self._cancelled_at - self.segments_started - paused
+            rtf = busy / self.position
+            freed += max(0.0, self.duration - self.position) * rtf
+        return freed * self.cpu_threads
+
+
+class Scheduler:
+    """Pile de jobs actifs triée par priorité : seul le sommet tourne, les autres sont en pause."""
+
+    def __init__(self):
+        self._jobs = []
+        self._lock = threading.Lock()
+        self.freed_core_seconds = 0.0
+
+    def start(self, job: JobControl):
+        with self._lock:
+            if not self._jobs or job.priority > self._jobs[-1].priority:
+                if self._jobs:
+                    self._jobs[-1].pause("preempt")
+                self._jobs.append(job)
+                return
+            # Un job moins (ou aussi) prioritaire attend sous les jobs en cours
+            idx = len(self._jobs)
+            while idx > 0 and self._jobs[idx - 1].priority >= job.priority:
+                idx -= 1
+            job.pause("preempt")
+            self._jobs.insert(idx, job)
+
+    def finish(self, job: JobControl):
+        with self._lock:
+            was_top = bool(self._jobs) and self._jobs[-1] is job
+            if job in self._jobs:
+                self._jobs.remove(job)
+            self.freed_core_seconds += job.freed_core_seconds()
+            if was_top and self._jobs:
+                self._jobs[-1].resume("preempt")
+
+    @property
+    def active(self):
+        with self._lock:
+            return self._jobs[-1] if self._jobs else None
+
+    @property
+    def preempted(self) -> list:
+        with self._lock:
+            return self._jobs[:-1]
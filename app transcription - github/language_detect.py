@@ -0,0 +1,132 @@
+"""
+Détection automatique de la langue, avec cache par empreinte audio.
+
+La détection utilise un petit modèle (`base`, int8) sur quelques fenêtres
+de parole choisies par le VAD (`WhisperModel.detect_language`), ce qui
+coûte une poignée de passes d'encodeur, loin du temps de transcription.
+Le résultat est mis en cache par empreinte de contenu (celle du magasin
+audio) : un fichier déjà vu n'est jamais ré-analysé, même renommé.
+
+`model_for(lang, model_name)` oriente ensuite vers la variante anglaise
+`.en` des modèles base/small/medium, plus rapide et plus juste en anglais,
+uniquement si elle est installée dans le magasin local (`model_bundle.py`) :
+un poste hors ligne ne déclenche jamais de téléchargement. De même, sans
+bundle `base` local, la détection réutilise le modèle déjà chargé par
+l'appelant.
+"""
+
+import os
+import sys
+import json
+import time
+import pathlib
+import threading
+
+import audio_store
+
+AUTO = "auto"
+DETECT_MODEL = "base"
+DETECT_SEGMENTS = 3         # fenêtres de 30 s de parole analysées
+MIN_PROBABILITY = 0.5       # en dessous, on garde la langue par défaut
+CACHE_PATH = pathlib.Path(
+    os.environ.get(
+        "WHISPER_LANG_CACHE",
+        pathlib.Path.home() / ".cache" / "whisper-app" / "languages.json",
+    )
+)
+
+# Modèles disposant d'une variante anglaise seule
+_EN_MODELS = {"base": "base.en", "small": "small.en", "medium": "medium.en"}
+
+_lock = threading.Lock()        # cache
+_model_lock = threading.Lock()  # modèle de détection partagé entre threads
+_detector = None
+_cache = None
+
+
+def _load_cache() -> dict:
+    global _cache
+    if _cache is None:
+        try:
+            _cache = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def _save_cache():
+    CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE_PATH.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(_cache, indent=1), encoding="utf-8")
+    os.replace(tmp, CACHE_PATH)
+
+
+def _is_local(name: str, compute_type: str) -> bool:
+    import model_bundle
+
+    return model_bundle.resolve(name, compute_type) != name
+
+
+def _get_detector(model=None):
+    """Petit modèle `base` s'il est installé localement, sinon `model` (déjà chargé)."""
+    global _detector
+    if _detector is None:
+        import autotune
+        import model_bundle
+
+        kwargs = autotune.model_kwargs("cpu", mode="latency")
+        if model is not None and not _is_local(DETECT_MODEL, kwargs["compute_type"]):
+            return model
+        _detector = model_bundle.load_model(DETECT_MODEL, **kwargs)
+    return _detector
+
+
+def detect(path: str, default: str = "fr", model=None) -> dict:
+    """{"language", "probability", "seconds", "cached"} pour le fichier `path`.
+
+    `model` : modèle déjà chargé, utilisé si le bundle `base` n'est pas installé.
+    """
+    store = audio_store.default_store()
+    key = store.key_for(path)
+    with _lock:
+        hit = _load_cache().get(key)
+    if hit:
+        return dict(hit, seconds=0.0, cached=True)
+
+    # Décodage hors chronomètre : la transcription réutilise ensuite cet audio
+    audio = audio_store.load(path)
+    if isinstance(audio, str):
+        # Magasin indisponible : `detect_language` n'accepte qu'un tableau
+        from faster_whisper import decode_audio
+        audio = decode_audio(audio, sampling_rate=audio_store.SAMPLE_RATE)
+    with _model_lock:
+        detector = _get_detector(model)
+        t0 = time.perf_counter()
+        language, prob, _ = detector.detect_language(
+            audio,
+            vad_filter=True,
+            language_detection_segments=DETECT_SEGMENTS,
+            language_detection_threshold=MIN_PROBABILITY,
+        )
+        seconds = time.perf_counter() - t0
+    result = {"language": language if prob >= MIN_PROBABILITY else default,
+              "probability": round(float(prob), 3)}
+    with _lock:
+        _load_cache()[key] = result
+        _save_cache()
+    return dict(result, seconds=seconds, cached=False)
+
+
+def model_for(language: str, model_name: str, compute_type: str = "int8") -> str:
+    """Modèle à utiliser pour `language` (variante `.en` si elle est installée localement)."""
+    en_name = _EN_MODELS.get(model_name)
+    if language == "en" and en_name and _is_local(en_name, compute_type):
+        return en_name
+    return model_name
+
+
+if __name__ == "__main__":
+    for f in sys.argv[1:]:
+        r = detect(f)
+        cost = "cache" if r["cached"] else f"{r['seconds']:.1f}s"
+        print(f"{os.path.basename(f)} : {r['language']} ({r['probability']:.0%}, {cost})")
@@ -0,0 +1,259 @@
+"""
+Magasin local de modèles CTranslate2 pré-convertis, pour les postes hors ligne.
+
+Chaque bundle est un dossier `<modèle>-<quantization>-v<version>` contenant
+les fichiers CTranslate2 (model.bin, config.json, tokenizer.json…) et un
+`manifest.json` listant l'empreinte SHA-256 de chaque fichier. Les assets
+VAD Silero (.onnx) sont rangés à part dans `assets/` avec leur propre
+manifeste.
+
+Sur une machine connectée :
+    python model_bundle.py pack large-v3 --quantization int8
+    python model_bundle.py export bundle.tar
+Sur le poste hors ligne :
+    python model_bundle.py install bundle.tar
+    python model_bundle.py list | verify
+
+`resolve(name, compute_type)` renvoie le dossier du bundle correspondant, que
+l'on passe tel quel à `WhisperModel(...)` : aucune requête réseau n'est faite.
+`load_model(name, **kwargs)` fait les deux et sert à tous les points d'entrée.
+Le chargement reste celui de CTranslate2 (lecture de model.bin en mémoire,
+pas de mmap possible), mais il n'y a plus de téléchargement au premier run.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import pathlib
+import tarfile
+import argparse
+import tempfile
+
+STORE_DIR = pathlib.Path(
+    os.environ.get(
+        "WHISPER_MODEL_STORE",
+        pathlib.Path.home() / ".cache" / "whisper-app" / "models",
+    )
+)
+ASSETS_DIR = STORE_DIR / "assets"
+VAD_ASSETS = ("silero_encoder_v5.onnx", "silero_decoder_v5.onnx")
+MANIFEST = "manifest.json"
+
+# Correspondance compute_type demandé -> quantization stockée la plus proche
+_QUANT_FOR = {
+    "int8": "int8",
+    "int8_float32": "int8",
+    "int8_float16": "int8_float16",
+    "float16": "float16",
+    "float32": "float32",
+}
+
+
+def _sha256(path: pathlib.Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(4 * 1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_manifest(folder: pathlib.Path, info: dict) -> dict:
+    files = {}
+    for p in sorted(folder.rglob("*")):
+        if p.is_file() and p.name != MANIFEST:
+            rel = p.relative_to(folder).as_posix()
+            files[rel] = {"sha256": _sha256(p), "size": p.stat().st_size}
+    manifest = dict(info, files=files, created=time.strftime("%Y-%m-%d %H:%M:%S"))
+    (folder / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+def read_manifest(folder: pathlib.Path) -> dict:
+    try:
+        return json.loads((pathlib.Path(folder) / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def verify(folder: pathlib.Path, full: bool = True) -> list:
+    """Liste des fichiers manquants ou corrompus ; `full=False` ne contrôle que les tailles."""
+    folder = pathlib.Path(folder)
+    manifest = read_manifest(folder)
+    if not manifest:
+        return [MANIFEST]
+    bad = []
+    for rel, meta in manifest["files"].items():
+        p = folder / rel
+        if not p.is_file() or p.stat().st_size != meta["size"]:
+            bad.append(rel)
+        elif full and _sha256(p) != meta["sha256"]:
+            bad.append(rel)
+    return bad
+
+
+# -------------------------------------------------------------
+# Consultation du magasin
+# -------------------------------------------------------------
+def bundles(store: pathlib.Path = STORE_DIR) -> list:
+    store = pathlib.Path(store)
+    if not store.exists():
+        return []
+    found = []
+    for d in store.iterdir():
+        m = read_manifest(d) if d.is_dir() and d.name != "assets" else {}
+        if m.get("kind") == "model":
+            found.append((d, m))
+    return sorted(found, key=lambda x: (x[1]["name"], x[1]["quantization"], x[1]["version"]))
+
+
+def resolve(name: str, compute_type: str = "int8", store: pathlib.Path = STORE_DIR) -> str:
+    """Dossier du bundle le plus récent pour `name`, sinon `name` (téléchargement hub)."""
+    quant = _QUANT_FOR.get(compute_type, compute_type)
+    candidates = [(d, m) for d, m in bundles(store) if m["name"] == name]
+    # Priorité à la quantization exacte, puis à n'importe quelle variante du modèle
+    exact = [c for c in candidates if c[1]["quantization"] == quant]
+    for d, m in reversed(exact or candidates):
+        if not verify(d, full=False):
+            return str(d)
+    return name
+
+
+def load_model(name: str, **kwargs):
+    """`WhisperModel` depuis le bundle local s'il existe, sinon depuis le hub."""
+    from faster_whisper import WhisperModel
+
+    return WhisperModel(resolve(name, kwargs.get("compute_type", "default")), **kwargs)
+
+
+# -------------------------------------------------------------
+# Création / installation
+# -------------------------------------------------------------
+def _next_version(name: str, quant: str, store: pathlib.Path) -> int:
+    versions = [m["version"] for _, m in bundles(store)
+                if m["name"] == name and m["quantization"] == quant]
+    return max(versions, default=0) + 1
+
+
+def pack(name: str, quantization: str = None, store: pathlib.Path = STORE_DIR) -> pathlib.Path:
+    """Télécharge (et convertit si besoin) un modèle puis l'ajoute au magasin."""
+    store = pathlib.Path(store)
+    store.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=store) as tmp:
+        tmp = pathlib.Path(tmp) / "model"
+        if quantization:
+            # Conversion depuis les poids OpenAI : nécessite transformers + torch
+            from ctranslate2.converters import TransformersConverter
+            TransformersConverter(
+                f"openai/whisper-{name}",
+                copy_files=["tokenizer.json", "preprocessor_config.json"],
+            ).convert(str(tmp), quantization=quantization)
+        else:
+            from faster_whisper import download_model
+            shutil.copytree(download_model(name), tmp)
+            quantization = "float16"  # poids publiés par Systran
+
+        version = _next_version(name, quantization, store)
+        _write_manifest(tmp, {"kind": "model", "name": name,
+                              "quantization": quantization, "version": version})
+        dst = store / f"{name}-{quantization}-v{version}"
+        os.replace(tmp, dst)
+    pack_assets(store)
+    return dst
+
+
+def pack_assets(store: pathlib.Path = STORE_DIR, src: pathlib.Path = None) -> pathlib.Path:
+    """Copie les .onnx du VAD dans le magasin (depuis `assets/` de l'appli)."""
+    src = pathlib.Path(src or pathlib.Path(__file__).parent / "assets")
+    dst = pathlib.Path(store) / "assets"
+    dst.mkdir(parents=True, exist_ok=True)
+    for fname in VAD_ASSETS:
+        if (src / fname).exists():
+            shutil.copy2(src / fname, dst / fname)
+    _write_manifest(dst, {"kind": "assets", "name": "vad", "quantization": None, "version": 1})
+    return dst
+
+
+def export(archive: str, store: pathlib.Path = STORE_DIR) -> str:
+    """Archive tar (non compressée : les poids ne se compressent pas) du magasin."""
+    store = pathlib.Path(store)
+    with tarfile.open(archive, "w") as tar:
+        for d, _ in bundles(store):
+            tar.add(d, arcname=d.name)
+        if (store / "assets").exists():
+            tar.add(store / "assets", arcname="assets")
+    return archive
+
+
+def install(archive: str, store: pathlib.Path = STORE_DIR) -> list:
+    """Extrait une archive dans le magasin après vérification des empreintes.
+
+    Tout ou rien : si un seul dossier est invalide, rien n'est installé.
+    """
+    store = pathlib.Path(store)
+    store.mkdir(parents=True, exist_ok=True)
+    installed = []
+    with tempfile.TemporaryDirectory(dir=store) as tmp, tarfile.open(archive) as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(tmp, filter="data")
+        else:
+            tar.extractall(tmp)
+        extracted = sorted(pathlib.Path(tmp).iterdir())
+        errors = []
+        for d in extracted:
+            bad = verify(d)
+            if bad:
+                errors.append(f"{d.name} : fichiers invalides {bad}")
+        if errors:
+            raise ValueError("; ".join(errors))
+        for d in extracted:
+            dst = store / d.name
+            if dst.exists():
+                # L'ancienne version n'est supprimée qu'une fois la nouvelle en place
+                old = pathlib.Path(tmp) / f"{d.name}.old"
+                os.replace(dst, old)
+                os.replace(d, dst)
+                shutil.rmtree(old)
+            else:
+                os.replace(d, dst)
+            installed.append(dst)
+    return installed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bundles de modèles hors ligne.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_pack = sub.add_parser("pack", help="ajoute un modèle au magasin (machine connectée)")
+    p_pack.add_argument("name", help="base, small, medium, large-v3…")
+    p_pack.add_argument("--quantization", help="int8, float16… (conversion CTranslate2)")
+    p_export = sub.add_parser("export", help="archive le magasin pour un poste hors ligne")
+    p_export.add_argument("archive")
+    p_install = sub.add_parser("install", help="installe une archive après vérification")
+    p_install.add_argument("archive")
+    sub.add_parser("list", help="liste les bundles installés")
+    sub.add_parser("verify", help="recalcule toutes les empreintes")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "pack":
+        print(f"Bundle créé : {pack(args.name, args.quantization)}")
+    elif args.cmd == "export":
+        print(f"Archive créée : {export(args.archive)}")
+    elif args.cmd == "install":
+        for d in install(args.archive):
+            print(f"Installé : {d}")
+    elif args.cmd == "list":
+        for d, m in bundles():
+            print(f"{m['name']:<10} {m['quantization']:<13} v{m['version']}  {d}")
+    else:
+        failed = False
+        for d in [d for d, _ in bundles()] + ([ASSETS_DIR] if ASSETS_DIR.exists() else []):
+            bad = verify(d)
+            failed |= bool(bad)
+            print(f"{d.name:<30} {'OK' if not bad else 'INVALIDE ' + ', '.join(bad)}")
+        return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
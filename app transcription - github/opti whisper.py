@@ -8,7 +8,13 @@ from concurrent.futures import ThreadPoolExecutor
 
 import customtkinter as ctk
 from tkinter import filedialog
-from faster_whisper import WhisperModel
+
+import autotune
+import audio_store
+import search_index
+import job_control
+import model_bundle
+import language_detect
 
 try:
     import torch  # facultatif ; seulement pour détecter un éventuel GPU
@@ -26,6 +32,7 @@ MODELS = {
 }
 
 LANGS = {
+    "Auto (détection)": language_detect.AUTO,
     "Français": "fr",
     "Anglais": "en",
     "Espagnol": "es",
@@ -58,11 +65,12 @@ def _ensure_vad_assets_once():
     dst_assets = pathlib.Path.home() / ".cache" / "faster-whisper" / "assets"
     dst_assets.mkdir(parents=True, exist_ok=True)
 
-    for fname in ("silero_encoder_v5.onnx", "silero_decoder_v5.onnx"):
-        src = src_assets / fname
+    for fname in model_bundle.VAD_ASSETS:
         dst = dst_assets / fname
+        # Repli sur les assets du magasin hors ligne (`model_bundle.py install`)
+        src = next((d / fname for d in (src_assets, model_bundle.ASSETS_DIR) if (d / fname).exists()), None)
         try:
-            if src.exists() and not dst.exists():
+            if src is not None and not dst.exists():
                 shutil.copy2(src, dst)
         except Exception as e:
             print(f"[WARN] Impossible de copier {fname}: {e}")
@@ -83,7 +91,7 @@ class App(ctk.CTk):
     def __init__(self):
         super().__init__()
         self.title("Transcripteur Whisper – version optimisée")
-        self.geometry("700x560")
+        self.geometry("700x600")
         self.resizable(False, False)
 
         # Paramètres et état
@@ -91,6 +99,11 @@ class App(ctk.CTk):
         self.current_file_idx = 0
         self.model = None  # instance WhisperModel réutilisée
         self.current_model_key = None
+        self.model_kwargs = {}
+        self.routed_models = {}  # variantes chargées selon la langue détectée (ex. small.en)
+        self.routed_lock = threading.Lock()  # jobs lot et urgent peuvent router en même temps
+        self.cpu_threads = 1
+        self.scheduler = job_control.Scheduler()  # jobs actifs (lot + urgents)
         self.executor = ThreadPoolExecutor(max_workers=max(1, os.cpu_count() // 2))
 
         # -------- Frame du haut (choix modèle/langue) --------
@@ -115,6 +128,16 @@ class App(ctk.CTk):
         self.btn_run = ctk.CTkButton(self, text="Lancer la transcription", command=self.run_batch, state="disabled")
         self.btn_run.pack(pady=4)
 
+        # -------- Contrôle du job en cours --------
+        ctrl = ctk.CTkFrame(self)
+        ctrl.pack(pady=4)
+        self.btn_pause = ctk.CTkButton(ctrl, text="Pause", width=120, command=self.toggle_pause, state="disabled")
+        self.btn_pause.pack(side="left", padx=5)
+        self.btn_cancel = ctk.CTkButton(ctrl, text="Annuler", width=120, command=self.cancel_current, state="disabled")
+        self.btn_cancel.pack(side="left", padx=5)
+        self.btn_urgent = ctk.CTkButton(ctrl, text="Fichier urgent…", width=140, command=self.run_urgent)
+        self.btn_urgent.pack(side="left", padx=5)
+
         # -------- Zone log --------
         self.txt_log = ctk.CTkTextbox(self, width=670, height=330)
         self.txt_log.pack(pady=8, padx=10)
@@ -166,13 +189,36 @@ class App(ctk.CTk):
         # (Re)chargement requis
         model_name = MODELS[key]
         device = "cuda" if torch and torch.cuda.is_available() else "cpu"
-        compute_type = "float16" if device == "cuda" else "int8"
-
-        self._log(f"\n[INFO] Chargement du modèle {model_name} ({device}, {compute_type})…\n")
-        self.model = WhisperModel(model_name, device=device, compute_type=compute_type)
+        # Profil issu de `python autotune.py` s'il existe, sinon int8 par défaut
+        kwargs = autotune.model_kwargs(device, mode="latency")
+
+        self._log(f"\n[INFO] Chargement du modèle {model_name} ({device}, {kwargs['compute_type']})…\n")
+        # Bundle local pré-converti s'il existe : aucun accès réseau
+        self.model = model_bundle.load_model(model_name, **kwargs)
+        # CTranslate2 utilise 4 threads par défaut quand cpu_threads n'est pas fixé
+        self.cpu_threads = kwargs.get("cpu_threads") or min(4, os.cpu_count() or 1)
+        self.model_kwargs = kwargs
+        self.routed_models = {}
         self.current_model_key = key
         return self.model
 
+    def _get_model_for(self, lang_code: str, base_name: str):
+        """Modèle adapté à la langue détectée (appelé depuis le thread de transcription)."""
+        return self._get_model_named(
+            language_detect.model_for(lang_code, base_name, self.model_kwargs["compute_type"])
+        )
+
+    def _get_model_named(self, name: str):
+        """Modèle du lot, ou modèle annexe (variante .en, modèle d'un job urgent) chargé à part."""
+        if name == MODELS[self.current_model_key]:
+            return self.model
+        with self.routed_lock:
+            if name not in self.routed_models:
+                self.after(0, lambda: self._log(f"[INFO] Chargement du modèle {name}…\n"))
+                kwargs = self.model_kwargs
+                self.routed_models[name] = model_bundle.load_model(name, **kwargs)
+            return self.routed_models[name]
+
     # ---------------------------------------------------------
     # Lancer le batch
     # ---------------------------------------------------------
@@ -187,6 +233,7 @@ class App(ctk.CTk):
 
         # Assure le modèle prêt avant de lancer le premier thread
         self._get_or_load_model()
+        self.scheduler.freed_core_seconds = 0.0  # total affiché en fin de lot
         self.after(100, self._process_next_file)
 
     def _process_next_file(self):
@@ -194,32 +241,100 @@ class App(ctk.CTk):
             self._log("\nTous les fichiers ont été transcrits.\n")
             self.progress.set(1)
             self.btn_run.configure(state="normal")
+            self._log(f"[INFO] Temps cœur libéré (pauses/annulations) : {self.scheduler.freed_core_seconds:.0f} s\n")
             return
 
         filepath = self.files[self.current_file_idx]
         self._log(f"\n——\n[{self.current_file_idx + 1}/{len(self.files)}] {os.path.basename(filepath)}\n")
         self.progress.set(0)
+        self._start_job(filepath, priority=0)
+
+    def _start_job(self, filepath: str, priority: int, model_name: str = None):
+        job = job_control.JobControl(os.path.basename(filepath), priority, self.cpu_threads)
+        self.scheduler.start(job)
+        self._refresh_controls()
 
         # Lancement du thread de transcription
-        threading.Thread(target=self._transcribe_file, args=(filepath,), daemon=True).start()
+        threading.Thread(target=self._transcribe_file, args=(filepath, job, model_name), daemon=True).start()
+
+    # ---------------------------------------------------------
+    # Pause / annulation / priorité
+    # ---------------------------------------------------------
+    def _refresh_controls(self):
+        job = self.scheduler.active
+        state = "normal" if job else "disabled"
+        self.btn_pause.configure(state=state, text="Reprendre" if job and job.paused else "Pause")
+        self.btn_cancel.configure(state=state)
+
+    def toggle_pause(self):
+        job = self.scheduler.active
+        if job is None:
+            return
+        if job.paused:
+            job.resume()
+            self._log(f"[INFO] Reprise de {job.name}\n")
+        else:
+            job.pause()
+            self._log(f"[INFO] Pause de {job.name} (effective à la fin du segment en cours)\n")
+        self._refresh_controls()
+
+    def cancel_current(self):
+        job = self.scheduler.active
+        if job is not None:
+            job.cancel()
+            self._log(f"[INFO] Annulation de {job.name}…\n")
+
+    def run_urgent(self):
+        """Transcrit un fichier en priorité : le job en cours est suspendu puis repris."""
+        filepath = filedialog.askopenfilename(
+            title="Fichier urgent à transcrire",
+            filetypes=[("Audio", "*.mp3 *.wav *.m4a *.flac")],
+        )
+        if not filepath:
+            return
+        current = self.scheduler.active
+        if current is None:
+            self._get_or_load_model()  # aucun lot en cours : on peut changer le modèle principal
+        # Sinon le modèle du lot reste en place ; celui de l'urgent est chargé à part si différent
+        model_name = MODELS[self.combo_model.get()]
+        if current is not None:
+            self._log(f"[INFO] {current.name} suspendu à {current.position:.0f}s pour un fichier urgent\n")
+        self._log(f"\n——\n[URGENT] {os.path.basename(filepath)}\n")
+        self._start_job(filepath, priority=(current.priority + 1) if current else 1, model_name=model_name)
 
     # ---------------------------------------------------------
     # Transcription d’un fichier (thread dédié)
     # ---------------------------------------------------------
-    def _transcribe_file(self, filepath: str):
-        start_time = time.time()
+    def _transcribe_file(self, filepath: str, job: job_control.JobControl, model_name: str = None):
         try:
-            model = self.model  # déjà chargé
+            job.checkpoint()  # attend ici si un job plus prioritaire tourne déjà
+            # Chronomètre lancé après l'attente en file ; les pauses ultérieures sont déduites
+            start_time = time.time()
+            paused_before = job.paused_seconds
+            model_name = model_name or MODELS[self.current_model_key]
+            model = self._get_model_named(model_name)  # déjà chargé pour le lot
             lang_code = LANGS[self.combo_lang.get()]
-
+            detect_s = 0.0
+            if lang_code == language_detect.AUTO:
+                det = language_detect.detect(filepath, model=model)
+                lang_code, detect_s = det["language"], det["seconds"]
+                source = "cache" if det["cached"] else f"{detect_s:.1f}s"
+                self.after(0, lambda: self._log(
+                    f"[INFO] Langue détectée : {det['language']} ({det['probability']:.0%}, {source})\n"
+                ))
+                model = self._get_model_for(lang_code, model_name)
+
+            # Audio pré-décodé (mémoire mappée) : ffmpeg ne tourne qu'une fois par fichier
             segments, info = model.transcribe(
-                filepath,
+                audio_store.load(filepath),
                 language=lang_code,
                 beam_size=5,
                 vad_filter=True,
             )
 
             duration_audio = info.duration or 1
+            job.duration = info.duration
+            job.checkpoint(0.0)  # début des segments : base du RTF de `freed_core_seconds`
             done_seconds = 0.0
             last_ui = 0.0  # dernière mise à jour UI
 
@@ -230,9 +345,11 @@ class App(ctk.CTk):
                 os.path.splitext(os.path.basename(filepath))[0] + ".txt",
             )
 
-            with open(out_file, "w", encoding="utf-8") as out_f:
+            with open(out_file, "w", encoding="utf-8") as out_f, \
+                    search_index.writer(out_file, filepath, lang_code, out_dir) as index:
                 for seg in segments:
                     out_f.write(seg.text + "\n")
+                    index.add(seg.start, seg.end, seg.text)
                     done_seconds += seg.end - seg.start
 
                     # Mise à jour UI limitée à UPDATE_INTERVAL
@@ -242,24 +359,48 @@ class App(ctk.CTk):
                         self.after(0, lambda p=pct: self.progress.set(p))
                         last_ui = now
 
+                    # Point d'arrêt coopératif : bloque ici en pause, sort si annulé
+                    job.checkpoint(seg.end)
+
             elapsed = time.time() - start_time
-            self.after(0, lambda: self._on_file_done(filepath, out_file, elapsed))
+            busy = max(elapsed - (job.paused_seconds - paused_before), 1e-6)
+            if detect_s:
+                self.after(0, lambda: self._log(f"[INFO] Détection de langue : {detect_s / busy:.1%} du temps\n"))
+            self.after(0, lambda: self._on_file_done(filepath, out_file, elapsed, job))
 
+        except job_control.JobCancelled:
+            self.after(0, lambda: self._on_file_cancelled(filepath, job))
         except Exception as e:
-            self.after(0, lambda: self._on_file_error(filepath, e))
+            self.after(0, lambda: self._on_file_error(filepath, e, job))
 
     # ---------------------------------------------------------
     # Callbacks UI post‑transcription
     # ---------------------------------------------------------
-    def _on_file_done(self, filepath: str, out_file: str, elapsed: float):
+    def _on_file_done(self, filepath: str, out_file: str, elapsed: float, job: job_control.JobControl):
         self._log(
             f"Transcription terminée ({elapsed:.1f}s). Fichier texte : {out_file}\n"
         )
-        self.current_file_idx += 1
-        self.after(200, self._process_next_file)
+        self._finish_job(job)
+
+    def _on_file_cancelled(self, filepath: str, job: job_control.JobControl):
+        self._log(
+            f"[INFO] {os.path.basename(filepath)} annulé à {job.position:.0f}s "
+            f"({job.freed_core_seconds():.0f} s cœur libérées)\n"
+        )
+        self._finish_job(job)
 
-    def _on_file_error(self, filepath: str, err: Exception):
+    def _on_file_error(self, filepath: str, err: Exception, job: job_control.JobControl):
         self._log(f"[ERREUR] {os.path.basename(filepath)} : {err}\n")
+        self._finish_job(job)
+
+    def _finish_job(self, job: job_control.JobControl):
+        self.scheduler.finish(job)  # reprend le job préempté s'il y en a un
+        self._refresh_controls()
+        if job.priority > 0:
+            resumed = self.scheduler.active
+            if resumed is not None:
+                self._log(f"[INFO] Reprise de {resumed.name} à {resumed.position:.0f}s\n")
+            return  # un job urgent ne fait pas avancer le lot
         self.current_file_idx += 1
         self.after(200, self._process_next_file)
 
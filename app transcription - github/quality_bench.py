@@ -0,0 +1,242 @@
+"""
+Banc de régression qualité/vitesse : WER/CER vs RTF, avec front de Pareto.
+
+Jeu de référence : un dossier contenant pour chaque enregistrement un
+fichier audio et sa transcription exacte de même nom (`reunion.mp3` +
+`reunion.txt`). Chaque réglage de la matrice (compute_type × beam_size ×
+mode) transcrit tout le jeu avec les mêmes appels que les points d'entrée
+(`model.transcribe(..., vad_filter=True)` de `opti whisper.py` et
+`transcription.py`), puis on mesure WER, CER et RTF (temps / durée audio).
+
+Un réglage n'est retenu comme « plus rapide » que si son WER reste dans
+`--tolerance` (absolu) du réglage de référence de l'appli (int8, beam 5,
+séquentiel).
+
+Usage : python quality_bench.py DOSSIER_REF [--model large-v3] [--language fr]
+        [--compute-types int8 float32] [--beams 1 5] [--modes sequential batched sharded]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from rapidfuzz.distance import Levenshtein  # facultatif ; distance d'édition en C
+except ImportError:
+    Levenshtein = None
+
+import audio_store
+
+AUDIO_EXTS = (".mp3", ".wav", ".m4a", ".flac")
+MODES = ("sequential", "batched", "sharded")
+BASELINE = {"compute_type": "int8", "beam_size": 5, "mode": "sequential"}
+SHARDS = 4
+BATCH_SIZE = 8
+
+
+# -------------------------------------------------------------
+# Métriques
+# -------------------------------------------------------------
+def normalize(text: str) -> str:
+    """Minuscules, apostrophes unifiées, ponctuation retirée (accents conservés)."""
+    text = unicodedata.normalize("NFC", text).lower().replace("’", "'")
+    text = re.sub(r"[^\w\s']", " ", text)
+    return " ".join(text.split())
+
+
+def _edit_distance(ref: list, hyp: list) -> int:
+    """Distance de Levenshtein entre deux séquences (mots ou caractères)."""
+    if Levenshtein is not None:
+        return Levenshtein.distance(ref, hyp)
+    if not ref or not hyp:
+        return len(ref) + len(hyp)
+    # DP ligne par ligne vectorisée : l'insertion se propage par un minimum cumulé
+    vocab = {}
+    r = np.array([vocab.setdefault(t, len(vocab)) for t in ref])
+    h = np.array([vocab.setdefault(t, len(vocab)) for t in hyp])
+    cols = np.arange(len(h) + 1)
+    prev = cols.copy()
+    cur = np.empty_like(prev)
+    for i, tok in enumerate(r, 1):
+        cur[0] = i
+        np.minimum(prev[1:] + 1, prev[:-1] + (h != tok), out=cur[1:])
+        prev = np.minimum.accumulate(cur - cols) + cols
+    return int(prev[-1])
+
+
+def error_counts(ref: str, hyp: str) -> tuple:
+    """(erreurs mots, mots de référence, erreurs caractères, caractères de référence)."""
+    r, h = normalize(ref), normalize(hyp)
+    return (_edit_distance(r.split(), h.split()), len(r.split()),
+            _edit_distance(r, h), len(r))
+
+
+def wer(ref: str, hyp: str) -> float:
+    w_err, w_ref, _, _ = error_counts(ref, hyp)
+    return w_err / max(1, w_ref)
+
+
+def cer(ref: str, hyp: str) -> float:
+    _, _, c_err, c_ref = error_counts(ref, hyp)
+    return c_err / max(1, c_ref)
+
+
+def pareto_front(results: list) -> list:
+    """Réglages non dominés sur (RTF, WER), triés du plus rapide au plus lent."""
+    front = []
+    for r in sorted(results, key=lambda r: (r["rtf"], r["wer"])):
+        if not front or r["wer"] < front[-1]["wer"]:
+            front.append(r)
+    return front
+
+
+# -------------------------------------------------------------
+# Transcription
+# -------------------------------------------------------------
+def load_reference_set(folder: str) -> list:
+    pairs = []
+    for name in sorted(os.listdir(folder)):
+        stem, ext = os.path.splitext(name)
+        ref = os.path.join(folder, stem + ".txt")
+        if ext.lower() in AUDIO_EXTS and os.path.exists(ref):
+            with open(ref, encoding="utf-8") as f:
+                pairs.append((os.path.join(folder, name), f.read()))
+    return pairs
+
+
+def _transcribe(model, audio, language: str, beam_size: int) -> str:
+    # Mêmes paramètres que `opti whisper.py` / `transcription.py`
+    segments, _ = model.transcribe(audio, language=language, beam_size=beam_size, vad_filter=True)
+    return "\n".join(s.text for s in segments)
+
+
+def transcribe_with(setting: dict, model, audio: np.ndarray, language: str) -> str:
+    mode, beam = setting["mode"], setting["beam_size"]
+    if mode == "sequential":
+        return _transcribe(model, audio, language, beam)
+    if mode == "batched":
+        from faster_whisper import BatchedInferencePipeline
+        pipeline = BatchedInferencePipeline(model=model)
+        segments, _ = pipeline.transcribe(audio, language=language, beam_size=beam, batch_size=BATCH_SIZE)
+        return "\n".join(s.text for s in segments)
+    if mode == "sharded":
+        # Découpage en SHARDS tronçons transcrits en parallèle (num_workers=SHARDS)
+        shards = [s for s in np.array_split(np.asarray(audio), SHARDS) if len(s)]
+        with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+            return "\n".join(pool.map(lambda s: _transcribe(model, s, language, beam), shards))
+    raise ValueError(f"Mode inconnu : {mode}")
+
+
+def run_matrix(ref_set: list, model_name: str, language: str, compute_types, beams, modes, log=print) -> list:
+    import model_bundle
+
+    audios = [(audio_store.default_store().load(path), ref) for path, ref in ref_set]
+    total_audio = sum(len(a) for a, _ in audios) / audio_store.SAMPLE_RATE
+    results = []
+    for compute_type in compute_types:
+        model = model_bundle.load_model(model_name, device="cpu",
+                                        compute_type=compute_type, num_workers=SHARDS)
+        # Échauffement hors chronomètre, comme `autotune.py` : le premier réglage
+        # mesuré ne paie pas le coût du premier appel
+        _transcribe(model, audios[0][0][: audio_store.SAMPLE_RATE * 2], language, 1)
+        for beam in beams:
+            for mode in modes:
+                setting = {"compute_type": compute_type, "beam_size": beam, "mode": mode}
+                t0 = time.perf_counter()
+                hyps = [transcribe_with(setting, model, audio, language) for audio, _ in audios]
+                elapsed = time.perf_counter() - t0
+                # Distances par fichier, sommées : coût linéaire en nombre de fichiers
+                counts = [error_counts(ref, hyp) for (_, ref), hyp in zip(audios, hyps)]
+                w_err, w_ref, c_err, c_ref = (sum(c[i] for c in counts) for i in range(4))
+                result = dict(
+                    setting,
+                    wer=round(w_err / max(1, w_ref), 4),
+                    cer=round(c_err / max(1, c_ref), 4),
+                    elapsed_s=round(elapsed, 2),
+                    rtf=round(elapsed / total_audio, 4),
+                )
+                log(f"  {compute_type:<8} beam {beam} {mode:<10} WER {result['wer']:.2%}  "
+                    f"CER {result['cer']:.2%}  RTF {result['rtf']:.3f}")
+                results.append(result)
+        del model
+    return results
+
+
+# -------------------------------------------------------------
+# Rapport
+# -------------------------------------------------------------
+def _label(r: dict) -> str:
+    return f"{r['compute_type']} / beam {r['beam_size']} / {r['mode']}"
+
+
+def build_report(results: list, tolerance: float) -> dict:
+    baseline = next((r for r in results if all(r[k] == v for k, v in BASELINE.items())), None)
+    for r in results:
+        r["accepted"] = baseline is None or r["wer"] <= baseline["wer"] + tolerance
+        r["faster"] = bool(baseline) and r["accepted"] and r["rtf"] < baseline["rtf"]
+    return {
+        "tolerance": tolerance,
+        "baseline": baseline,
+        "pareto": pareto_front(results),
+        "results": results,
+    }
+
+
+def write_report(report: dict, out_dir: str) -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, "quality_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    pareto = {id(r) for r in report["pareto"]}
+    lines = [
+        "# Qualité vs vitesse",
+        "",
+        f"Tolérance WER : +{report['tolerance']:.1%} (absolu) par rapport à "
+        + (_label(report["baseline"]) if report["baseline"] else "— (référence absente)"),
+        "",
+        "| Réglage | WER | CER | RTF | Pareto | Plus rapide et accepté |",
+        "|---|---|---|---|---|---|",
+    ]
+    for r in sorted(report["results"], key=lambda r: r["rtf"]):
+        lines.append(
+            f"| {_label(r)} | {r['wer']:.2%} | {r['cer']:.2%} | {r['rtf']:.3f} | "
+            f"{'oui' if id(r) in pareto else ''} | {'oui' if r['faster'] else ('' if r['accepted'] else 'rejeté')} |"
+        )
+    path = os.path.join(out_dir, "quality_report.md")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Régression qualité (WER/CER) vs vitesse (RTF).")
+    parser.add_argument("reference", help="dossier audio + .txt de référence")
+    parser.add_argument("--model", default="large-v3")
+    parser.add_argument("--language", default="fr")
+    parser.add_argument("--compute-types", nargs="+", default=["int8", "float32"])
+    parser.add_argument("--beams", nargs="+", type=int, default=[1, 5])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--tolerance", type=float, default=0.01, help="écart de WER admis (0.01 = 1 point)")
+    parser.add_argument("--output", default="bench")
+    args = parser.parse_args(argv)
+
+    ref_set = load_reference_set(args.reference)
+    if not ref_set:
+        parser.error(f"aucune paire audio/.txt dans {args.reference}")
+    os.environ.setdefault("KMP_DUPLICATE_LIB_OK", "TRUE")
+
+    results = run_matrix(ref_set, args.model, args.language,
+                         args.compute_types, args.beams, args.modes)
+    path = write_report(build_report(results, args.tolerance), args.output)
+    print(f"\nRapport : {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Index plein texte horodaté du corpus `transcriptions/`.
+
+Les segments (texte + début/fin) sont ajoutés au fil de la transcription
+dans une base SQLite FTS5 (`transcriptions/index.sqlite`). La tokenisation
+`unicode61 remove_diacritics 2` rend la recherche insensible aux accents
+et à la casse ; les élisions françaises (l', d', qu'…) sont coupées sur
+l'apostrophe. Chaque résultat renvoie le fichier audio et l'horodatage
+pour pouvoir réécouter le passage.
+
+Les segments vivent dans une table ordinaire `seg` indexée par fichier ;
+`segments` est un index FTS5 à contenu externe tenu à jour par triggers, si
+bien que ré-indexer un fichier ne touche que ses propres lignes.
+
+Usage : python search_index.py "phrase exacte" [--limit 20]
+        python search_index.py --import-txt   (anciens .txt, sans horodatage)
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import contextlib
+
+INDEX_DIR = "transcriptions"
+INDEX_NAME = "index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    transcript TEXT UNIQUE NOT NULL,
+    audio TEXT,
+    language TEXT,
+    indexed_at REAL
+);
+CREATE TABLE IF NOT EXISTS seg (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    start REAL,
+    end REAL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS seg_file ON seg(file_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5(
+    text,
+    content = 'seg',
+    content_rowid = 'id',
+    tokenize = "unicode61 remove_diacritics 2"
+);
+CREATE TRIGGER IF NOT EXISTS seg_ai AFTER INSERT ON seg BEGIN
+    INSERT INTO segments (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS seg_ad AFTER DELETE ON seg BEGIN
+    INSERT INTO segments (segments, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+
+def index_path(out_dir: str = INDEX_DIR) -> str:
+    return os.path.join(out_dir, INDEX_NAME)
+
+
+def connect(out_dir: str = INDEX_DIR) -> sqlite3.Connection:
+    os.makedirs(out_dir, exist_ok=True)
+    conn = sqlite3.connect(index_path(out_dir), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")  # lectures possibles pendant l'indexation
+    conn.execute("PRAGMA synchronous=NORMAL")
+    _migrate(conn)
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _migrate(conn: sqlite3.Connection):
+    """Ancien schéma (file_id/start/end dans la table FTS5) -> table `seg` + FTS externe."""
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'segments'").fetchone()
+    if not row or "file_id" not in row[0]:
+        return
+    # Un seul script : la migration est atomique
+    conn.executescript(
+        "BEGIN;"
+        "ALTER TABLE segments RENAME TO segments_old;"
+        + _SCHEMA +
+        "INSERT INTO seg (file_id, start, end, text)"
+        " SELECT file_id, start, end, text FROM segments_old ORDER BY rowid;"
+        "DROP TABLE segments_old;"
+        "COMMIT;"
+    )
+
+
+def _format_ts(seconds) -> str:
+    if seconds is None:
+        return "--:--:--"
+    s = int(seconds)
+    return f"{s // 3600:02d}:{s % 3600 // 60:02d}:{s % 60:02d}"
+
+
+# -------------------------------------------------------------
+# Écriture
+# -------------------------------------------------------------
+class SegmentWriter:
+    """Accumule les segments d'un fichier en mémoire.
+
+    Aucune transaction n'est ouverte pendant la transcription (qui peut durer
+    des heures ou être mise en pause) : tout est écrit d'un coup par `commit`.
+    """
+
+    def __init__(self, transcript: str, audio: str = None, language: str = None):
+        self.transcript = os.path.abspath(transcript)
+        self.audio = audio
+        self.language = language
+        self.rows = []
+
+    def add(self, start, end, text: str):
+        text = text.strip()
+        if text:
+            self.rows.append((text, start, end))
+
+    def commit(self, conn: sqlite3.Connection):
+        """Remplace l'entrée du fichier dans une transaction courte."""
+        with conn:
+            row = conn.execute(
+                "SELECT id FROM files WHERE transcript = ?", (self.transcript,)
+            ).fetchone()
+            if row:
+                file_id = row[0]
+                conn.execute("DELETE FROM seg WHERE file_id = ?", (file_id,))
+                conn.execute(
+                    "UPDATE files SET audio = ?, language = ?, indexed_at = ? WHERE id = ?",
+                    (self.audio, self.language, time.time(), file_id),
+                )
+            else:
+                file_id = conn.execute(
+                    "INSERT INTO files (transcript, audio, language, indexed_at) VALUES (?, ?, ?, ?)",
+                    (self.transcript, self.audio, self.language, time.time()),
+                ).lastrowid
+            conn.executemany(
+                "INSERT INTO seg (text, file_id, start, end) VALUES (?, ?, ?, ?)",
+                [(text, file_id, start, end) for text, start, end in self.rows],
+            )
+
+
+@contextlib.contextmanager
+def writer(transcript: str, audio: str = None, language: str = None, out_dir: str = INDEX_DIR):
+    """Contexte d'indexation d'un fichier ; rien n'est écrit si la transcription échoue."""
+    w = SegmentWriter(transcript, audio, language)
+    yield w
+    conn = connect(out_dir)
+    try:
+        w.commit(conn)
+    finally:
+        conn.close()
+
+
+def import_txt(out_dir: str = INDEX_DIR) -> int:
+    """Indexe les .txt existants (une ligne = un segment, sans horodatage)."""
+    conn = connect(out_dir)
+    n = 0
+    try:
+        indexed = {r[0] for r in conn.execute("SELECT transcript FROM files")}
+        for name in sorted(os.listdir(out_dir)):
+            path = os.path.abspath(os.path.join(out_dir, name))
+            if not name.endswith(".txt") or path in indexed:
+                continue
+            w = SegmentWriter(path)
+            with open(path, encoding="utf-8", errors="replace") as f:
+                for line in f:
+                    w.add(None, None, line)
+            w.commit(conn)
+            n += 1
+    finally:
+        conn.close()
+    return n
+
+
+# -------------------------------------------------------------
+# Recherche
+# -------------------------------------------------------------
+def _phrase(query: str) -> str:
+    """Requête utilisateur -> expression FTS5 (phrase exacte par défaut)."""
+    query = query.strip()
+    if query.startswith('"') or any(op in query.split() for op in ("AND", "OR", "NOT", "NEAR")):
+        return query  # syntaxe FTS5 déjà fournie
+    return '"' + query.replace('"', '""') + '"'
+
+
+def search(query: str, limit: int = 20, out_dir: str = INDEX_DIR) -> list:
+    """Liste de dicts {transcript, audio, start, end, text} triés par pertinence.
+
+    Lève ValueError si la requête n'est pas une expression FTS5 valide.
+    """
+    if not os.path.exists(index_path(out_dir)):
+        return []
+    conn = connect(out_dir)
+    try:
+        rows = conn.execute(
+            """
+            SELECT f.transcript, f.audio, s.start, s.end,
+                   snippet(segments, 0, '[', ']', '…', 16)
+            FROM segments
+            JOIN seg s ON s.id = segments.rowid
+            JOIN files f ON f.id = s.file_id
+            WHERE segments MATCH ?
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (_phrase(query), limit),
+        ).fetchall()
+    except sqlite3.OperationalError as e:
+        # Syntaxe FTS5 invalide (guillemet non fermé, opérateur orphelin…)
+        raise ValueError(f"Requête invalide « {query} » : {e}") from e
+    finally:
+        conn.close()
+    return [
+        {"transcript": t, "audio": a, "start": s, "end": e, "text": txt}
+        for t, a, s, e, txt in rows
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recherche dans les transcriptions.")
+    parser.add_argument("query", nargs="?", help="phrase à rechercher (insensible aux accents)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--dir", default=INDEX_DIR, help="dossier des transcriptions")
+    parser.add_argument("--import-txt", action="store_true", help="indexe les .txt non encore indexés")
+    args = parser.parse_args(argv)
+
+    if args.import_txt:
+        print(f"{import_txt(args.dir)} fichier(s) importé(s)")
+    if not args.query:
+        return
+
+    t0 = time.perf_counter()
+    try:
+        hits = search(args.query, args.limit, args.dir)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for h in hits:
+        source = h["audio"] or h["transcript"]
+        print(f"{os.path.basename(source)} [{_format_ts(h['start'])}] {h['text']}")
+    print(f"\n{len(hits)} résultat(s) en {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,12 @@ import os
 import threading
 import customtkinter as ctk
 from tkinter import filedialog
-from faster_whisper import WhisperModel
+
+import autotune
+import audio_store
+import search_index
+import model_bundle
+import language_detect
 
 # ----------- Paramètres disponibles ----------
 MODELS = {
@@ -12,6 +17,7 @@ MODELS = {
     "Large v3 (CPU lourd)": "large-v3"
 }
 LANGS = {
+    "Auto (détection)": language_detect.AUTO,
     "Français": "fr",
     "Anglais": "en",
     "Espagnol": "es",
@@ -42,11 +48,11 @@ def _ensure_vad_assets():
         src_assets = pathlib.Path(__file__).with_suffix("").parent / "assets"
     dst_assets = pathlib.Path.home() / ".cache" / "faster-whisper" / "assets"
     dst_assets.mkdir(parents=True, exist_ok=True)
-    for fname in ("silero_encoder_v5.onnx", "silero_decoder_v5.onnx"):
-        src = src_assets / fname
+    for fname in model_bundle.VAD_ASSETS:
         dst = dst_assets / fname
+        src = next((d / fname for d in (src_assets, model_bundle.ASSETS_DIR) if (d / fname).exists()), None)
         try:
-            if src.exists() and not dst.exists():
+            if src is not None and not dst.exists():
                 shutil.copy2(src, dst)
         except Exception as e:
             print(f"[WARN] Impossible de copier {fname}: {e}")
@@ -143,18 +149,28 @@ class App(ctk.CTk):
         try:
             model_name = MODELS[self.combo_model.get()]
             lang_code = LANGS[self.combo_lang.get()]
-            model = WhisperModel(model_name, device="cpu", compute_type="int8")
+            kwargs = autotune.model_kwargs("cpu", mode="latency")
+            model = model_bundle.load_model(model_name, **kwargs)
+            if lang_code == language_detect.AUTO:
+                det = language_detect.detect(fichier, model=model)
+                lang_code = det["language"]
+                self.after(0, lambda: self.txt_progress.insert(
+                    "end", f"Langue détectée : {det['language']} ({det['probability']:.0%})\n"))
+                routed = language_detect.model_for(lang_code, model_name, kwargs["compute_type"])
+                if routed != model_name:
+                    model = model_bundle.load_model(routed, **kwargs)
 
             segments, info = model.transcribe(
-                fichier,
+                audio_store.load(fichier),
                 language=lang_code,
                 beam_size=5,
                 vad_filter=True
             )
             duration = info.duration or 1
-            done, full_text = 0.0, ""
+            done, full_text, timed = 0.0, "", []
 
             for seg in segments:
+                timed.append((seg.start, seg.end, seg.text))
                 done += seg.end - seg.start
                 pct = min(done / duration, 1.0)
                 self.after(0, lambda pct=pct: self.progressbar.set(pct))
@@ -167,6 +183,9 @@ class App(ctk.CTk):
             out_file = os.path.join(out_dir, os.path.splitext(os.path.basename(fichier))[0] + ".txt")
             with open(out_file, "w", encoding="utf-8") as f:
                 f.write(full_text)
+            with search_index.writer(out_file, fichier, lang_code, out_dir) as index:
+                for start, end, text in timed:
+                    index.add(start, end, text)
             self.after(0, lambda: self.after_transcription(fichier, out_file))
         except Exception as e:
             self.after(0, lambda: self.txt_progress.insert("end", f"\n[ERREUR] {e}\n"))
@@ -1,29 +1,50 @@
 import sys
 import os
-from faster_whisper import WhisperModel
+
+import autotune
+import audio_store
+import search_index
+import model_bundle
+import language_detect
 
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
 
 audio_path = sys.argv[1]
+# Langue en 2e argument (défaut : fr) ; "auto" pour la détecter
+lang_code = sys.argv[2] if len(sys.argv) > 2 else "fr"
+model_name = "large-v3"
 basename = os.path.splitext(os.path.basename(audio_path))[0]
 out_dir = "transcriptions"
 os.makedirs(out_dir, exist_ok=True)
 out_file = os.path.join(out_dir, f"{basename}.txt")
 
 # Ici, "medium" pour la qualité supérieure, device="cpu" pour que ça marche partout
-model = WhisperModel("large-v3", device="cpu", compute_type="int8")
+# cpu_threads / compute_type repris du profil `autotune.py` s'il existe
+kwargs = autotune.model_kwargs("cpu", mode="latency")
+model = model_bundle.load_model(model_name, **kwargs)
+if lang_code == language_detect.AUTO:
+    lang_code = language_detect.detect(audio_path, model=model)["language"]
+    print(f"Langue détectée : {lang_code}", flush=True)
+    routed = language_detect.model_for(lang_code, model_name, kwargs["compute_type"])
+    if routed != model_name:
+        model = model_bundle.load_model(routed, **kwargs)
 
 full_text = ""
+timed = []
 
 # Lance la transcription avec streaming segment par segment
-segments, info = model.transcribe(audio_path, language="fr", beam_size=5, vad_filter=True)
+segments, info = model.transcribe(audio_store.load(audio_path), language=lang_code, beam_size=5, vad_filter=True)
 
 for segment in segments:
     print(segment.text, flush=True)
     full_text += segment.text + "\n"
+    timed.append((segment.start, segment.end, segment.text))
 
 with open(out_file, "w", encoding="utf-8") as f:
     f.write(full_text)
+with search_index.writer(out_file, audio_path, lang_code, out_dir) as index:
+    for start, end, text in timed:
+        index.add(start, end, text)
 
 print(f"\nTranscription terminée : {out_file}")
@@ -12,6 +12,7 @@ APP_DIR = os.path.join(BASE_DIR, 'app transcription - github')
 MAIN_SCRIPT = os.path.join(APP_DIR, 'opti whisper.py')  # main application
 REQUIREMENTS = os.path.join(APP_DIR, 'requirements.txt')
 ICON_FILE = os.path.join(APP_DIR, 'icon.ico')
+ASSETS_DIR = os.path.join(APP_DIR, 'assets')
 
 def run(cmd):
     print(f'Running: {cmd}')
@@ -25,12 +26,15 @@ def main():
     run('pip install pyinstaller')
 
     # build executable
-    cmd = (
-        f'pyinstaller --onefile --windowed --icon="{ICON_FILE}" '
-        f'"{MAIN_SCRIPT}"'
-    )
+    cmd = f'pyinstaller --onefile --windowed --icon="{ICON_FILE}" '
+    if os.path.isdir(ASSETS_DIR):
+        # VAD Silero : copiés au premier lancement depuis sys._MEIPASS/assets
+        cmd += f'--add-data "{ASSETS_DIR}{os.pathsep}assets" '
+    cmd += f'"{MAIN_SCRIPT}"'
     run(cmd)
     print('\nExecutable created in the dist directory.')
+    print('Models are not bundled in the .exe: use "model_bundle.py export" / "install" '
+          'to provision air-gapped machines.')
 
 
 if __name__ == '__main__':